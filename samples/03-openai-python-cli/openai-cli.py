@@ -4,42 +4,318 @@ Sample 03: OpenAI Python CLI Application
 
 Simple command-line chat with AI Foundry using OpenAI SDK.
 Type messages, get AI responses, type 'quit' to exit.
+
+Non-interactive use: pass --batch prompts.txt (one prompt per line), or pipe
+prompts on stdin, to submit them all through the Batch API instead.
 """
 
 import os
+import sys
+import json
+import time
+import argparse
+import functools
+import pickle
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 
-def main():
-    # Load environment variables
-    load_dotenv('../../.env')
-    
-    # Initialize client with DefaultAzureCredential
-    token_provider = get_bearer_token_provider(
-        DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
+# Resolve the repo-root .env from this file's location, not the current directory
+_ENV_PATH = Path(__file__).resolve().parents[2] / '.env'
+
+@functools.lru_cache(maxsize=1)
+def load_configuration():
+    """Load settings from the repo-root .env file (memoized)."""
+    load_dotenv(_ENV_PATH)
+    return {
+        'endpoint': os.getenv('AZURE_OPENAI_ENDPOINT'),
+        'deployment_name': os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME'),
+        'api_version': os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview'),
+        'embedding_deployment': os.getenv('AZURE_OPENAI_EMBEDDING_DEPLOYMENT'),
+        'api_key': os.getenv('AZURE_OPENAI_API_KEY'),
+    }
+
+# The system message is kept static and verbatim, and the same dict instance is
+# reused for every request. Server-side prompt caching only hits when the
+# prompt prefix is byte-identical across calls, so never interpolate dynamic
+# data (dates, deployment names, ...) into it.
+SYSTEM_MESSAGE = "You are a helpful AI assistant."
+SYSTEM_MSG = ({"role": "system", "content": SYSTEM_MESSAGE},)
+
+# Only the system message plus the most recent turns are re-sent each request,
+# so a long session doesn't grow the payload (and token cost) without bound.
+MAX_HISTORY_TURNS = 12
+
+# Words that end the chat (empty input just re-prompts)
+_QUIT = frozenset({"quit", "exit", "q"})
+# Longer input can't be a quit word, so it is never lowercased (prompts can be long)
+_QUIT_MAX_LEN = max(map(len, _QUIT))
+
+def trim_history(messages):
+    """Drop the oldest user/assistant pairs, keeping the system message first."""
+    if len(messages) > 1 + 2 * MAX_HISTORY_TURNS:
+        del messages[1:len(messages) - 2 * MAX_HISTORY_TURNS]
+
+MAX_TOKENS = 500
+TEMPERATURE = 0.7
+
+# Responses are cached on disk, keyed by a hash of everything that goes into
+# the request, so repeating a conversation never goes back to the model.
+CACHE_PATH = Path.home() / ".cache" / "aifoundry-cli.db"
+
+def open_cache():
+    """Open (and create if needed) the on-disk response cache."""
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    cache = sqlite3.connect(CACHE_PATH)
+    cache.execute("CREATE TABLE IF NOT EXISTS kv (hash BLOB PRIMARY KEY, response TEXT)")
+    return cache
+
+def get_ai_response(client, cache, deployment_name, messages, semantic_cache=None):
+    """Return the assistant reply for messages, using the caches when possible."""
+    key = hashlib.sha256(
+        json.dumps([deployment_name, TEMPERATURE, MAX_TOKENS, messages], sort_keys=True).encode()
+    ).digest()
+
+    row = cache.execute("SELECT response FROM kv WHERE hash = ?", (key,)).fetchone()
+    if row is not None:
+        return row[0]
+
+    # The semantic cache only answers the opening question of a conversation;
+    # later turns depend on the history, not just on the latest message.
+    query_embedding = None
+    if semantic_cache is not None and len(messages) == 2:
+        query_embedding = semantic_cache.embed(messages[-1]["content"])
+        ai_response = semantic_cache.lookup(query_embedding)
+        if ai_response is not None:
+            return ai_response
+
+    response = client.chat.completions.create(
+        model=deployment_name,
+        messages=messages,
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE
     )
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-        azure_ad_token_provider=token_provider,
-        api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
+    ai_response = response.choices[0].message.content
+
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO kv (hash, response) VALUES (?, ?)", (key, ai_response))
+    if query_embedding is not None:
+        semantic_cache.add(query_embedding, ai_response)
+    return ai_response
+
+# Optional semantic cache: near-duplicate opening questions (cosine similarity
+# above the threshold) reuse an earlier answer. Enabled by setting
+# AZURE_OPENAI_EMBEDDING_DEPLOYMENT. Entries are kept apart per chat
+# deployment, embedding deployment and system message, so an answer is only
+# reused for the same setup it was generated with.
+SEMANTIC_CACHE_PATH = Path.home() / ".cache" / "aifoundry-cli-semantic.pkl"
+SEMANTIC_THRESHOLD = 0.93
+
+class SemanticCache:
+    """Embedding-similarity cache backed by a single float32 matrix.
+
+    numpy is imported in the methods that need it, so it is only loaded when
+    the cache is enabled rather than on every startup.
+    """
+
+    def __init__(self, client, deployment_name, embedding_deployment):
+        self.client = client
+        self.embedding_deployment = embedding_deployment
+        self.key = (deployment_name, embedding_deployment, SYSTEM_MESSAGE)
+        # {key: (embeddings, responses)} for every setup seen, as stored on disk
+        self.entries = {}
+        if SEMANTIC_CACHE_PATH.exists():
+            with open(SEMANTIC_CACHE_PATH, "rb") as f:
+                data = pickle.load(f)
+            if isinstance(data, dict):  # Older unkeyed caches are discarded
+                self.entries = data
+        # One row per cached query, so a lookup is a single matrix-vector product
+        self.embeddings, self.responses = self.entries.get(self.key, (None, []))
+
+    def embed(self, text):
+        import numpy as np
+        result = self.client.embeddings.create(model=self.embedding_deployment, input=text)
+        return np.asarray(result.data[0].embedding, dtype=np.float32)
+
+    def lookup(self, query_embedding):
+        """Return the cached response most similar to the query, if close enough."""
+        import numpy as np
+        if self.embeddings is None:
+            return None
+        if self.embeddings.shape[1] != query_embedding.shape[0]:
+            # The embedding model behind the deployment changed - start over
+            self.embeddings, self.responses = None, []
+            return None
+        sims = self.embeddings @ query_embedding / (
+            np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_embedding)
+        )
+        best = int(np.argmax(sims))
+        return self.responses[best] if sims[best] > SEMANTIC_THRESHOLD else None
+
+    def add(self, query_embedding, response):
+        import numpy as np
+        row = query_embedding[np.newaxis, :]
+        self.embeddings = row if self.embeddings is None else np.vstack([self.embeddings, row])
+        self.responses.append(response)
+        self.entries[self.key] = (self.embeddings, self.responses)
+        SEMANTIC_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(SEMANTIC_CACHE_PATH, "wb") as f:
+            pickle.dump(self.entries, f)
+
+def initialize_client(config):
+    """Create the client.
+
+    Uses AZURE_OPENAI_API_KEY when set, otherwise DefaultAzureCredential.
+    The SDK imports live here so the key-based path never loads azure.identity
+    (and msal/cryptography behind it), which noticeably slows startup.
+    """
+    import httpx
+    from openai import AzureOpenAI, DefaultHttpxClient
+
+    if config['api_key']:
+        auth = {'api_key': config['api_key']}
+    else:
+        from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+        auth = {'azure_ad_token_provider': get_bearer_token_provider(
+            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
+        )}
+
+    return AzureOpenAI(
+        azure_endpoint=config['endpoint'],
+        api_version=config['api_version'],
+        **auth,
+        # HTTP/2 with a long keep-alive, so each turn reuses the warm TLS
+        # connection instead of reconnecting after the user's pause
+        http_client=DefaultHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300)
+        )
     )
+
+def prewarm(client):
+    """Open the connection and fetch a token before the first real request."""
+    try:
+        client.models.list()
+    except Exception:
+        pass  # Best effort - the first chat request will surface any real error
+
+# Batch API: prompts are answered asynchronously (within the completion
+# window) at a lower price than interactive calls. Requires a Global Batch
+# deployment.
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_SECONDS = 15
+BATCH_TERMINAL_STATES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+def run_batch(client, deployment_name, prompts):
+    """Submit prompts as one batch job, wait for it and print the answers."""
+    # The service rejects an empty input file, so don't create a job at all
+    # (e.g. stdin was /dev/null or an empty pipe)
+    if not prompts:
+        print("❌ No prompts to submit", file=sys.stderr)
+        return
+
+    requests = [
+        {
+            "custom_id": f"prompt-{i}",
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": {
+                "model": deployment_name,
+                "messages": [*SYSTEM_MSG, {"role": "user", "content": prompt}],
+                "max_tokens": MAX_TOKENS,
+                "temperature": TEMPERATURE
+            }
+        }
+        for i, prompt in enumerate(prompts)
+    ]
+    jsonl = "\n".join(json.dumps(r) for r in requests).encode()
+
+    batch_file = client.files.create(file=("prompts.jsonl", jsonl), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/chat/completions",
+        completion_window=BATCH_COMPLETION_WINDOW
+    )
+    print(f"📦 Submitted batch {batch.id} with {len(prompts)} prompts", file=sys.stderr)
+
+    while batch.status not in BATCH_TERMINAL_STATES:
+        time.sleep(BATCH_POLL_SECONDS)
+        batch = client.batches.retrieve(batch.id)
+        print(f"   status: {batch.status}", file=sys.stderr)
+
+    if not batch.output_file_id:
+        print(f"❌ Batch ended with status '{batch.status}' and no output", file=sys.stderr)
+        return
+
+    # Results come back in arbitrary order - match them up by custom_id
+    answers = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line:
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") == 200:
+            answers[result["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        else:
+            answers[result["custom_id"]] = f"[error: {result.get('error') or response.get('body')}]"
+
+    for i, prompt in enumerate(prompts):
+        print(f"You: {prompt}")
+        print(f"AI: {answers.get(f'prompt-{i}', '[no result]')}\n")
+
+def read_batch_prompts(args):
+    """Return prompts for batch mode, or None to run the interactive chat."""
+    if args.batch:
+        with open(args.batch, encoding="utf-8") as f:
+            lines = f.readlines()
+    elif not sys.stdin.isatty():
+        lines = sys.stdin.readlines()
+    else:
+        return None
+    return [line.strip() for line in lines if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch", metavar="FILE",
+                        help="submit the prompts in FILE (one per line) as a batch job")
+    args = parser.parse_args()
+
+    # Load configuration from the repo-root .env file
+    config = load_configuration()
     
-    deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+    # Initialize client (API key or DefaultAzureCredential)
+    client = initialize_client(config)
+    
+    deployment_name = config['deployment_name']
+
+    # Non-interactive: hand everything to the Batch API and exit
+    prompts = read_batch_prompts(args)
+    if prompts is not None:
+        run_batch(client, deployment_name, prompts)
+        return
+
+    # Warm up DNS/TLS/token in the background while the user types
+    threading.Thread(target=prewarm, args=(client,), daemon=True).start()
+
+    cache = open_cache()
+    semantic_cache = (
+        SemanticCache(client, deployment_name, config['embedding_deployment'])
+        if config['embedding_deployment'] else None
+    )
     
     print("🤖 AI Foundry CLI Chat")
     print("Type 'quit' to exit\n")
     
     # Initialize conversation with system message
-    messages = [
-        {"role": "system", "content": "You are a helpful AI assistant."}
-    ]
+    messages = list(SYSTEM_MSG)
     
     # Chat loop
     while True:
         user_input = input("You: ").strip()
         
-        if user_input.lower() in ['quit', 'exit', 'q']:
+        if len(user_input) <= _QUIT_MAX_LEN and user_input.lower() in _QUIT:
             print("Goodbye!")
             break
             
@@ -49,18 +325,12 @@ def main():
         # Add user message to conversation history
         messages.append({"role": "user", "content": user_input})
         
-        # Get AI response
-        response = client.chat.completions.create(
-            model=deployment_name,
-            messages=messages,
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        ai_response = response.choices[0].message.content
+        # Get AI response (served from the cache on a repeat)
+        ai_response = get_ai_response(client, cache, deployment_name, messages, semantic_cache)
         
         # Add AI response to conversation history
         messages.append({"role": "assistant", "content": ai_response})
+        trim_history(messages)
         
         print(f"AI: {ai_response}\n")
 
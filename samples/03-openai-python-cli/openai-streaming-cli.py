@@ -7,39 +7,156 @@ Watch AI responses appear in real-time, type 'quit' to exit.
 """
 
 import os
+import json
+import asyncio
+import functools
+import sys
+import threading
+import time
+from pathlib import Path
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 
-def main():
-    # Load environment variables
-    load_dotenv('../../.env')
-    
-    # Initialize client with DefaultAzureCredential
-    token_provider = get_bearer_token_provider(
-        DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-        azure_ad_token_provider=token_provider,
-        api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
+# Resolve the repo-root .env from this file's location, not the current directory
+_ENV_PATH = Path(__file__).resolve().parents[2] / '.env'
+
+@functools.lru_cache(maxsize=1)
+def load_configuration():
+    """Load settings from the repo-root .env file (memoized)."""
+    load_dotenv(_ENV_PATH)
+    return {
+        'endpoint': os.getenv('AZURE_OPENAI_ENDPOINT'),
+        'deployment_name': os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME'),
+        'api_version': os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview'),
+        'api_key': os.getenv('AZURE_OPENAI_API_KEY'),
+    }
+
+# Static system message; the same dict leads every request so the prompt
+# prefix stays byte-identical and server-side prompt caching can hit.
+SYSTEM_MESSAGE = "You are a helpful AI assistant."
+SYSTEM_MSG = ({"role": "system", "content": SYSTEM_MESSAGE},)
+
+# Only the system message plus the most recent turns are re-sent each request,
+# so a long session doesn't grow the payload (and token cost) without bound.
+MAX_HISTORY_TURNS = 12
+
+# Words that end the chat (empty input just re-prompts)
+_QUIT = frozenset({"quit", "exit", "q"})
+# Longer input can't be a quit word, so it is never lowercased (prompts can be long)
+_QUIT_MAX_LEN = max(map(len, _QUIT))
+
+def trim_history(messages):
+    """Drop the oldest user/assistant pairs, keeping the system message first."""
+    if len(messages) > 1 + 2 * MAX_HISTORY_TURNS:
+        del messages[1:len(messages) - 2 * MAX_HISTORY_TURNS]
+
+# Streamed deltas are buffered and written in small batches rather than
+# flushed one token at a time - each flush is a syscall.
+FLUSH_EVERY_CHUNKS = 8
+FLUSH_INTERVAL_SECONDS = 0.05
+
+def read_input(prompt):
+    """Return a future for input(prompt), read on a daemon thread.
+
+    input() blocks, so it runs off the event loop, which stays free for
+    network work (e.g. prewarm) while the user types. Unlike an executor
+    worker, a daemon thread still waiting at the prompt doesn't stop the
+    process from exiting on Ctrl-C.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
+
+    def run():
+        try:
+            result = (future.set_result, input(prompt))
+        except Exception as e:  # EOFError on Ctrl-D / closed stdin
+            result = (future.set_exception, e)
+        try:
+            loop.call_soon_threadsafe(deliver, *result)
+        except RuntimeError:
+            pass  # Loop already closed - the chat is over
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def initialize_client(config):
+    """Create the client, returning (client, credential).
+
+    Uses AZURE_OPENAI_API_KEY when set, otherwise DefaultAzureCredential.
+    The SDK imports live here so the key-based path never loads azure.identity
+    (and msal/cryptography behind it), which noticeably slows startup.
+    """
+    import httpx
+    from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+
+    credential = None
+    if config['api_key']:
+        auth = {'api_key': config['api_key']}
+    else:
+        from azure.identity.aio import DefaultAzureCredential, get_bearer_token_provider
+        credential = DefaultAzureCredential()
+        auth = {'azure_ad_token_provider': get_bearer_token_provider(
+            credential, "https://cognitiveservices.azure.com/.default"
+        )}
+
+    client = AsyncAzureOpenAI(
+        azure_endpoint=config['endpoint'],
+        api_version=config['api_version'],
+        **auth,
+        # HTTP/2 with a long keep-alive, so each turn reuses the warm TLS
+        # connection instead of reconnecting after the user's pause
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300)
+        )
     )
+    return client, credential
+
+async def prewarm(client):
+    """Open the connection and fetch a token before the first real request."""
+    try:
+        await client.models.list()
+    except Exception:
+        pass  # Best effort - the first chat request will surface any real error
+
+async def main():
+    # Load configuration from the repo-root .env file
+    config = load_configuration()
+
+    # Streamed text goes straight to the binary stdout buffer as UTF-8,
+    # skipping the text layer; keep that layer on UTF-8 as well so the two
+    # agree (Windows consoles default to a legacy code page)
+    if sys.platform == "win32":
+        sys.stdout.reconfigure(encoding="utf-8")
+    out = sys.stdout.buffer
     
-    deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+    # Initialize client (API key or DefaultAzureCredential)
+    client, credential = initialize_client(config)
+    
+    # Warm up DNS/TLS/token in the background while the user types
+    prewarm_task = asyncio.create_task(prewarm(client))
+
+    deployment_name = config['deployment_name']
     
     print("🤖 AI Foundry Streaming CLI Chat")
     print("Type 'quit' to exit\n")
     
     # Initialize conversation with system message
-    messages = [
-        {"role": "system", "content": "You are a helpful AI assistant."}
-    ]
+    messages = list(SYSTEM_MSG)
     
     # Chat loop
     while True:
-        user_input = input("You: ").strip()
+        try:
+            user_input = (await read_input("You: ")).strip()
+        except (EOFError, KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl-D, or Ctrl-C (which asyncio.run delivers as a cancellation)
+            print("\nGoodbye!")
+            break
         
-        if user_input.lower() in ['quit', 'exit', 'q']:
+        if len(user_input) <= _QUIT_MAX_LEN and user_input.lower() in _QUIT:
             print("Goodbye!")
             break
             
@@ -52,27 +169,73 @@ def main():
         # Get streaming AI response
         print("AI: ", end="", flush=True)
         
-        stream = client.chat.completions.create(
+        # Read the raw server-sent events rather than letting the SDK build a
+        # typed ChatCompletionChunk per token - we only need delta.content
+        parts = []
+        buf = []
+        error = None
+        last_flush = time.monotonic()
+        async with client.chat.completions.with_streaming_response.create(
             model=deployment_name,
             messages=messages,
             max_tokens=500,
             temperature=0.7,
             stream=True
-        )
-        
-        full_response = ""
-        for chunk in stream:
-            if (chunk.choices and 
-                chunk.choices[0].delta and 
-                chunk.choices[0].delta.content):
-                content = chunk.choices[0].delta.content
-                print(content, end="", flush=True)
-                full_response += content
+        ) as response:
+            async for line in response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                # A failure mid-stream arrives as an error event (the SDK's
+                # Stream raises it as APIError) - stop rather than treat the
+                # partial text as a complete answer
+                if "error" in event:
+                    error = event["error"]
+                    break
+                # Azure also sends chunks with no choices (content filter
+                # results) or an empty delta
+                choices = event.get("choices")
+                if not choices:
+                    continue
+                content = (choices[0].get("delta") or {}).get("content")
+                if not content:
+                    continue
+                buf.append(content)
+                if (len(buf) >= FLUSH_EVERY_CHUNKS or
+                    time.monotonic() - last_flush > FLUSH_INTERVAL_SECONDS):
+                    out.write("".join(buf).encode("utf-8", "replace"))
+                    out.flush()
+                    buf.clear()
+                    last_flush = time.monotonic()
+                parts.append(content)
         
+        # Drain whatever is left in the buffer
+        out.write("".join(buf).encode("utf-8", "replace"))
+        out.flush()
+
         print("\n")  # New line after streaming
+
+        if error is not None:
+            message = error.get("message") if isinstance(error, dict) else None
+            print(f"❌ Error: {message or error}\n")
+            messages.pop()  # Drop the unanswered question from the history
+            continue
+        full_response = "".join(parts)
         
         # Add AI response to conversation history
         messages.append({"role": "assistant", "content": full_response})
+        trim_history(messages)
+
+    prewarm_task.cancel()
+    await client.close()
+    if credential is not None:
+        await credential.close()
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass  # Ctrl-C; asyncio.run re-raises it once main() has cleaned up
@@ -7,12 +7,137 @@ but exposed as an MCP server that can be consumed by any MCP-compatible client.
 """
 
 import json
+import os
+import stat
 import sys
 from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 import asyncio
 import logging
-import random
+import select
+import zlib
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; fall back to the standard library
+    orjson = None
+
+if orjson is not None:
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+else:
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+# Possible weather conditions (shared by current weather and forecasts)
+_CONDITIONS = ("sunny", "cloudy", "partly cloudy", "rainy", "foggy", "snowy", "thunderstorms", "clear")
+
+_MASK64 = (1 << 64) - 1
+
+def _splitmix64(x: int) -> int:
+    """SplitMix64 mixing step: a cheap, well-distributed 64-bit hash of x.
+
+    Used instead of seeding a new random.Random (a full Mersenne Twister state)
+    for every (location, day) - the fake weather only needs a few
+    deterministic draws per seed.
+    """
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+def _loc_hash(location: Any) -> int:
+    """Stable hash of a location name.
+
+    Unlike hash(), which is randomized per process, this is the same across
+    runs, so a location gets the same fake weather after a server restart.
+    Clients don't always send a string (e.g. a zip code as a number), so the
+    value is hashed by its str() form.
+    """
+    return zlib.crc32(str(location).encode("utf-8"))
+
+# One 64-bit splitmix word per (location, day) supplies every field; each
+# field is peeled from its own bit slice of the word. len(_CONDITIONS) is a
+# power of two, so the condition index is a plain mask.
+_COND_MASK = len(_CONDITIONS) - 1
+
+def _forecast_core(loc_hash: int, base_ordinal: int, months: List[int]) -> List[Tuple[str, int, int, int, int]]:
+    """Generate (condition, high, low, humidity, wind_speed) for consecutive days.
+
+    Day i is seeded from loc_hash + base_ordinal + i; months[i] is its
+    calendar month, used for the seasonal adjustments. Only ints go in and
+    out, so the numeric work stays separate from building the response.
+    """
+    rows = []
+    for i, month in enumerate(months):
+        word = _splitmix64((loc_hash + base_ordinal + i) & _MASK64)
+
+        condition = _CONDITIONS[word & _COND_MASK]
+
+        # Generate base temperature in Fahrenheit
+        temperature = 15 + (word >> 3) % 81
+        humidity = 30 + (word >> 10) % 61
+        wind_speed = 5 + (word >> 16) % 21
+
+        # Seasonal adjustments (like sample 17)
+        if month in (12, 1, 2):  # Winter
+            temperature = max(temperature - 25, 10)
+            if (word >> 24) % 3 == 0:
+                condition = "snowy"
+        elif month in (6, 7, 8):  # Summer
+            temperature = min(temperature + 15, 100)
+
+        # Create high/low temps
+        half_variation = (5 + (word >> 32) % 11) // 2
+        rows.append((condition, temperature + half_variation, temperature - half_variation,
+                     humidity, wind_speed))
+    return rows
+
+# Weather results are memoized per day; the cache is also reset if it
+# grows past this many entries
+_WEATHER_CACHE_MAX = 1024
+
+# Longest JSON-RPC line accepted from stdin
+_MAX_LINE_BYTES = 16 * 1024 * 1024
+
+# Method and tool names, interned so dispatch-table lookups of (also
+# interned) incoming names hit on pointer identity
+_M_INITIALIZE = sys.intern("initialize")
+_M_INITIALIZED = sys.intern("notifications/initialized")
+_M_TOOLS_LIST = sys.intern("tools/list")
+_M_TOOLS_CALL = sys.intern("tools/call")
+_M_PROMPTS_LIST = sys.intern("prompts/list")
+_M_PROMPTS_GET = sys.intern("prompts/get")
+
+_T_CURRENT_WEATHER = sys.intern("get_current_weather")
+_T_WEATHER_FORECAST = sys.intern("get_weather_forecast")
+_T_CURRENT_DATETIME = sys.intern("get_current_datetime")
+
+# Responses are written straight to the stdout file descriptor, bypassing
+# sys.stdout's buffer; on Windows the fd is switched to binary mode so "\n"
+# isn't translated to "\r\n"
+_STDOUT_FD = sys.stdout.fileno()
+if sys.platform == "win32":
+    import msvcrt
+    msvcrt.setmode(_STDOUT_FD, os.O_BINARY)
+
+# Envelope for responses whose result is already serialized JSON
+_RESULT_TEMPLATE = b'{"jsonrpc":"2.0","id":%s,"result":%s}'
+
+# JSON-RPC error for a request that isn't an object (including an empty batch)
+_INVALID_REQUEST = _dumps({
+    "jsonrpc": "2.0",
+    "id": None,
+    "error": {
+        "code": -32600,
+        "message": "Invalid Request"
+    }
+})
+
+# Envelope for tools/call responses; only the id and the text are filled in
+_CALL_RESPONSE_TEMPLATE = b'{"jsonrpc":"2.0","id":%s,"result":{"content":[{"type":"text","text":%s}]}}'
 
 # MCP Protocol implementation
 class MCPServer:
@@ -108,22 +233,82 @@ class MCPServer:
             }
         }
 
-    def get_current_weather(self, location: str) -> Dict[str, Any]:
+        # The handshake result and the tool and prompt lists never change, so
+        # build and serialize them once rather than on every request
+        self._initialize_json = _dumps({
+            "protocolVersion": "2024-11-05",
+            "capabilities": {
+                "tools": {},
+                "prompts": {}
+            },
+            "serverInfo": {
+                "name": "weather-server",
+                "version": "1.0.0"
+            }
+        })
+        self._tools_list = list(self.tools.values())
+        self._prompts_list = list(self.prompts.values())
+        self._tools_list_json = _dumps({"tools": self._tools_list})
+        self._prompts_list_json = _dumps({"prompts": self._prompts_list})
+
+        # Generated weather is a pure function of (location, date[, days]),
+        # so results are memoized until the date changes
+        self._weather_cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        self._weather_cache_day: Optional[int] = None
+
+        # Dispatch tables: one dict lookup instead of walking an if/elif chain
+        self._method_handlers = {
+            _M_INITIALIZE: self._h_initialize,
+            _M_INITIALIZED: self._h_initialized,
+            _M_TOOLS_LIST: self._h_tools_list,
+            _M_TOOLS_CALL: self._h_tools_call,
+            _M_PROMPTS_LIST: self._h_prompts_list,
+            _M_PROMPTS_GET: self._h_prompts_get,
+        }
+        self._tool_handlers = {
+            _T_CURRENT_WEATHER: lambda args, now: self.get_current_weather(
+                args.get("location", ""),
+                now=now
+            ),
+            _T_WEATHER_FORECAST: lambda args, now: self.get_weather_forecast(
+                args.get("location", ""),
+                args.get("days", 3),
+                now=now
+            ),
+            _T_CURRENT_DATETIME: lambda args, now: self.get_current_datetime(
+                args.get("timezone", "local"),
+                now=now
+            ),
+        }
+
+    def _weather_cache_get(self, key: Tuple[Any, ...], today_ordinal: int) -> Optional[Dict[str, Any]]:
+        """Look up a memoized weather result, dropping entries from earlier days."""
+        if today_ordinal != self._weather_cache_day or len(self._weather_cache) >= _WEATHER_CACHE_MAX:
+            self._weather_cache.clear()
+            self._weather_cache_day = today_ordinal
+        return self._weather_cache.get(key)
+
+    def get_current_weather(self, location: str, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Get fake current weather data for a location using consistent random generation."""
         # Generate consistent weather data based on location and current date
-        today = datetime.now().date()
-        seed = hash(location) + today.timetuple().tm_yday
-        rng = random.Random(seed)
+        today = (now or datetime.now()).date()
+        today_ordinal = today.toordinal()
+        key = (location, today_ordinal)
+        cached = self._weather_cache_get(key, today_ordinal)
+        if cached is not None:
+            return cached
+
+        seed = _loc_hash(location) + today_ordinal
+        word = _splitmix64(seed & _MASK64)
         
-        conditions = ["sunny", "cloudy", "partly cloudy", "rainy", "foggy", "snowy", "thunderstorms", "clear"]
-        condition = conditions[rng.randint(0, len(conditions) - 1)]
+        condition = _CONDITIONS[word & _COND_MASK]
         
         # Generate temperature in Fahrenheit (15-95 range like sample 17)
-        temperature = rng.randint(15, 95)
-        humidity = rng.randint(30, 90)
-        wind_speed = rng.randint(5, 25)
+        temperature = 15 + (word >> 3) % 81
+        humidity = 30 + (word >> 10) % 61
+        wind_speed = 5 + (word >> 16) % 21
         
-        return {
+        result = {
             "location": location,
             "temperature": temperature,
             "condition": condition,
@@ -131,63 +316,52 @@ class MCPServer:
             "wind_speed": wind_speed,
             "unit": "Fahrenheit"
         }
+        self._weather_cache[key] = result
+        return result
 
-    def get_weather_forecast(self, location: str, days: int = 3) -> Dict[str, Any]:
+    def get_weather_forecast(self, location: str, days: int = 3, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Get fake weather forecast data for a location using consistent random generation."""
         # Ensure days is within valid range
         days = max(1, min(7, days))
         
-        forecast = []
-        today = datetime.now().date()
-        
-        for i in range(days):
-            target_date = today + timedelta(days=i)
-            
-            # Generate consistent weather data based on location and specific date
-            seed = hash(location) + target_date.timetuple().tm_yday
-            rng = random.Random(seed)
-            
-            conditions = ["sunny", "cloudy", "partly cloudy", "rainy", "foggy", "snowy", "thunderstorms", "clear"]
-            condition = conditions[rng.randint(0, len(conditions) - 1)]
-            
-            # Generate base temperature in Fahrenheit
-            temperature = rng.randint(15, 95)
-            humidity = rng.randint(30, 90)
-            wind_speed = rng.randint(5, 25)
-            
-            # Seasonal adjustments (like sample 17)
-            month = target_date.month
-            if month in [12, 1, 2]:  # Winter
-                temperature = max(temperature - 25, 10)
-                if rng.randint(0, 2) == 0:
-                    condition = "snowy"
-            elif month in [6, 7, 8]:  # Summer
-                temperature = min(temperature + 15, 100)
-            
-            # Create high/low temps
-            temp_variation = rng.randint(5, 15)
-            forecast.append({
+        today = (now or datetime.now()).date()
+        today_ordinal = today.toordinal()
+        key = (location, today_ordinal, days)
+        cached = self._weather_cache_get(key, today_ordinal)
+        if cached is not None:
+            return cached
+
+        dates = [today + timedelta(days=i) for i in range(days)]
+        rows = _forecast_core(_loc_hash(location), today_ordinal, [d.month for d in dates])
+        forecast = [
+            {
                 "date": target_date.strftime("%Y-%m-%d"),
-                "temperature_high": temperature + temp_variation // 2,
-                "temperature_low": temperature - temp_variation // 2,
+                "temperature_high": high,
+                "temperature_low": low,
                 "condition": condition,
                 "humidity": humidity,
                 "wind_speed": wind_speed
-            })
+            }
+            for target_date, (condition, high, low, humidity, wind_speed) in zip(dates, rows)
+        ]
         
-        return {
+        result = {
             "location": location,
             "forecast": forecast,
             "unit": "Fahrenheit"
         }
+        self._weather_cache[key] = result
+        return result
 
-    def get_current_datetime(self, timezone_str: str = "local") -> Dict[str, Any]:
-        """Get current date and time."""
+    def get_current_datetime(self, timezone_str: str = "local", now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get current date and time (or format now, a naive local datetime)."""
+        if now is None:
+            now = datetime.now()
         if timezone_str.lower() == "utc":
-            dt = datetime.now(timezone.utc)
+            dt = now.astimezone(timezone.utc)
             tz_name = "UTC"
         else:
-            dt = datetime.now()
+            dt = now
             tz_name = "Local"
         
         return {
@@ -197,101 +371,27 @@ class MCPServer:
             "timestamp": dt.timestamp()
         }
 
-    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle incoming MCP requests."""
+    async def handle_request(self, request: Any) -> Optional[Union[Dict[str, Any], bytes]]:
+        """Handle incoming MCP requests.
+
+        Returns a response dict, an already-serialized JSON response (bytes),
+        or None for notifications.
+        """
+        if not isinstance(request, dict):
+            return _INVALID_REQUEST
+
         method = request.get("method")
+        if type(method) is str:
+            method = sys.intern(method)
         params = request.get("params", {})
         request_id = request.get("id")
 
         try:
-            if method == "tools/list":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "tools": list(self.tools.values())
-                    }
-                }
-            
-            elif method == "tools/call":
-                tool_name = params.get("name")
-                arguments = params.get("arguments", {})
-                
-                if tool_name == "get_current_weather":
-                    result = self.get_current_weather(arguments.get("location", ""))
-                elif tool_name == "get_weather_forecast":
-                    result = self.get_weather_forecast(
-                        arguments.get("location", ""),
-                        arguments.get("days", 3)
-                    )
-                elif tool_name == "get_current_datetime":
-                    result = self.get_current_datetime(arguments.get("timezone", "local"))
-                else:
-                    raise ValueError(f"Unknown tool: {tool_name}")
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": json.dumps(result, indent=2)
-                            }
-                        ]
-                    }
-                }
-            
-            elif method == "prompts/list":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "prompts": list(self.prompts.values())
-                    }
-                }
-
-            elif method == "prompts/get":
-                prompt_name = params.get("name")
-                arguments = params.get("arguments", {})
-
-                if prompt_name not in self.prompts:
-                    raise ValueError(f"Unknown prompt: {prompt_name}")
-
-                messages = self._get_prompt_messages(prompt_name, arguments)
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "description": self.prompts[prompt_name]["description"],
-                        "messages": messages
-                    }
-                }
-
-            elif method == "initialize":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "protocolVersion": "2024-11-05",
-                        "capabilities": {
-                            "tools": {},
-                            "prompts": {}
-                        },
-                        "serverInfo": {
-                            "name": "weather-server",
-                            "version": "1.0.0"
-                        }
-                    }
-                }
-            
-            elif method == "notifications/initialized":
-                # This is a notification, no response needed
-                return None
-            
-            else:
+            handler = self._method_handlers.get(method)
+            if handler is None:
                 raise ValueError(f"Unknown method: {method}")
-                
+            return handler(request_id, params)
+
         except Exception as e:
             return {
                 "jsonrpc": "2.0",
@@ -302,6 +402,57 @@ class MCPServer:
                 }
             }
 
+    def _h_initialize(self, request_id: Any, params: Dict[str, Any]) -> bytes:
+        """Handshake: report protocol version, capabilities and server info."""
+        return _RESULT_TEMPLATE % (_dumps(request_id), self._initialize_json)
+
+    def _h_initialized(self, request_id: Any, params: Dict[str, Any]) -> None:
+        """notifications/initialized: a notification, so there is no response."""
+        return None
+
+    def _h_tools_list(self, request_id: Any, params: Dict[str, Any]) -> bytes:
+        """tools/list: return the cached tool list."""
+        return _RESULT_TEMPLATE % (_dumps(request_id), self._tools_list_json)
+
+    def _h_tools_call(self, request_id: Any, params: Dict[str, Any]) -> bytes:
+        """tools/call: run the named tool and return its result as text content."""
+        tool_name = params.get("name")
+        arguments = params.get("arguments", {})
+        if type(tool_name) is str:
+            tool_name = sys.intern(tool_name)
+
+        tool = self._tool_handlers.get(tool_name)
+        if tool is None:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        # One clock read per request, shared by whichever tool runs
+        result = tool(arguments, datetime.now())
+
+        # The text is compact JSON - clients parse it, nobody reads the indentation
+        text = _dumps(result).decode()
+        return _CALL_RESPONSE_TEMPLATE % (_dumps(request_id), _dumps(text))
+
+    def _h_prompts_list(self, request_id: Any, params: Dict[str, Any]) -> bytes:
+        """prompts/list: return the cached prompt list."""
+        return _RESULT_TEMPLATE % (_dumps(request_id), self._prompts_list_json)
+
+    def _h_prompts_get(self, request_id: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        """prompts/get: expand the named prompt template."""
+        prompt_name = params.get("name")
+        arguments = params.get("arguments", {})
+
+        if prompt_name not in self.prompts:
+            raise ValueError(f"Unknown prompt: {prompt_name}")
+
+        messages = self._get_prompt_messages(prompt_name, arguments)
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "description": self.prompts[prompt_name]["description"],
+                "messages": messages
+            }
+        }
+
     def _get_prompt_messages(self, prompt_name: str, arguments: Dict[str, str]) -> List[Dict[str, Any]]:
         """Generate prompt messages for a given prompt name and arguments."""
         if prompt_name == "time_in_location":
@@ -364,6 +515,92 @@ class MCPServer:
         else:
             raise ValueError(f"No message template for prompt: {prompt_name}")
 
+def _is_pipe_or_socket(fd: int) -> bool:
+    """True if fd is a FIFO or socket, the only stdin kinds read asynchronously."""
+    mode = os.fstat(fd).st_mode
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+
+async def read_lines():
+    """Yield lines from stdin without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+
+    # Pipes and sockets (how MCP clients launch the server) get a real async
+    # reader. Everything else - Windows, regular files, TTYs, /dev/null - is
+    # read on a worker thread: some character devices can't be polled, and a
+    # TTY shares its file description with stdout, which must stay blocking.
+    if sys.platform != "win32" and _is_pipe_or_socket(sys.stdin.fileno()):
+        reader = asyncio.StreamReader(limit=_MAX_LINE_BYTES)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except (ValueError, OSError):
+            os.set_blocking(sys.stdin.fileno(), True)
+        else:
+            while line := await reader.readline():
+                yield line
+            return
+
+    while line := await loop.run_in_executor(None, sys.stdin.buffer.readline):
+        yield line
+
+def write_response(data: bytes) -> None:
+    """Write one serialized JSON-RPC message to stdout as a line."""
+    # Usually a single os.write; loop in case the pipe takes a partial write
+    buf = memoryview(data + b"\n")
+    while buf:
+        try:
+            buf = buf[os.write(_STDOUT_FD, buf):]
+        except BlockingIOError:
+            # stdout can be non-blocking (e.g. a socket shared with stdin that
+            # the async reader switched over) - wait until it drains
+            select.select([], [_STDOUT_FD], [])
+
+async def process_line(server: MCPServer, line: bytes, logger: logging.Logger) -> None:
+    """Handle one JSON-RPC line and write its response, if any."""
+    try:
+        # Parse JSON-RPC request
+        request = _loads(line)
+
+        # A batch (JSON array of requests) is handled concurrently and
+        # answered with one array holding the non-notification responses
+        if isinstance(request, list):
+            if not request:
+                write_response(_INVALID_REQUEST)
+                return
+            responses = await asyncio.gather(*(server.handle_request(r) for r in request))
+            parts = [r if isinstance(r, bytes) else _dumps(r) for r in responses if r is not None]
+            if parts:
+                write_response(b"[" + b",".join(parts) + b"]")
+            return
+        
+        # Handle request
+        response = await server.handle_request(request)
+        
+        # Only send response if one is expected (not for notifications).
+        # The write is synchronous, so concurrent requests can't interleave
+        # partial lines on stdout.
+        if response is not None:
+            write_response(response if isinstance(response, bytes) else _dumps(response))
+        
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON: {e}")
+    except Exception as e:
+        logger.error(f"Error handling request: {e}")
+        # Send error response if we can determine the request ID
+        try:
+            request = _loads(line)
+            request_id = request.get("id")
+            error_response = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {
+                    "code": -32603,
+                    "message": f"Internal error: {str(e)}"
+                }
+            }
+            write_response(_dumps(error_response))
+        except:
+            pass
+
 async def main():
     """Main server loop."""
     server = MCPServer()
@@ -374,49 +611,21 @@ async def main():
     logger.info("MCP Weather Server starting...")
     logger.info("Available tools: get_current_weather, get_weather_forecast, get_current_datetime")
     
-    # Read from stdin and write to stdout (MCP protocol)
-    while True:
-        try:
-            # Read line from stdin
-            line = sys.stdin.readline()
-            if not line:
-                break
-                
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Parse JSON-RPC request
-            request = json.loads(line)
-            
-            # Handle request
-            response = await server.handle_request(request)
-            
-            # Only send response if one is expected (not for notifications)
-            if response is not None:
-                print(json.dumps(response))
-                sys.stdout.flush()
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON: {e}")
-        except Exception as e:
-            logger.error(f"Error handling request: {e}")
-            # Send error response if we can determine the request ID
-            try:
-                request = json.loads(line)
-                request_id = request.get("id")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32603,
-                        "message": f"Internal error: {str(e)}"
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
-            except:
-                pass
+    # Read from stdin and write to stdout (MCP protocol). Each request runs
+    # as its own task, so a slow request doesn't hold up the ones behind it.
+    pending = set()
+    async for line in read_lines():
+        line = line.strip()
+        if not line:
+            continue
+
+        task = asyncio.create_task(process_line(server, line, logger))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    # stdin closed - let in-flight requests finish before exiting
+    if pending:
+        await asyncio.gather(*pending)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -33,6 +33,11 @@ from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 from mcp.client.streamable_http import streamablehttp_client
 from mcp.client.session import ClientSession
 
+# Inputs that end the chat - including an empty line
+_QUIT = frozenset({"quit", "exit", "q", ""})
+# Longer input can't be a quit word, so it is never lowercased (prompts can be long)
+_QUIT_MAX_LEN = max(map(len, _QUIT))
+
 
 def mcp_tools_to_openai(mcp_tools) -> list[dict]:
     """
@@ -231,7 +236,7 @@ async def main():
                     print("\n👋 Goodbye!")
                     break
 
-                if not user_input or user_input.lower() in ("quit", "exit", "q"):
+                if len(user_input) <= _QUIT_MAX_LEN and user_input.lower() in _QUIT:
                     print("👋 Goodbye!")
                     break
 